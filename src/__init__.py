@@ -1,5 +1,6 @@
 
 from .smClasses import SM_Simulation, SM_State, registerModule
 from .smLogging import SM_MongoLogger
+from .smMetrics import SM_MetricsExporter, collectMetrics, metricsText
 from .smExceptions import *
 from .smConstructors import loadFromJson
\ No newline at end of file
@@ -3,9 +3,11 @@ from types import CodeType
 from typing import List, Tuple, Optional, Any, NamedTuple
 import warnings
 import importlib
+import time
 
 from .smExceptions import *
 from .smLogging import SM_LoggerBC, SM_NullLogger
+from .smMetrics import SM_SimMetrics
 
 class SM_Transition(NamedTuple):
     condition: CodeType
@@ -287,10 +289,9 @@ class SM_Simulation:
     """
 
     def __init__(self, startState:SM_State, inputParams:dict[str, Any], outputParams:Optional[List[str]] = None,\
-                logInterval:Optional[int] = None, logger:SM_LoggerBC = None):
+                logInterval:Optional[int] = None, logger:SM_LoggerBC = None, name:Optional[str] = None):
         self.simData = inputParams
         self.outputParams = outputParams
-        self.currentState = SM_ActiveState(startState, self.simData)
         self.remainingIterations:Optional[int] = None
         self.isRunning = False
         self.safe = True
@@ -301,21 +302,44 @@ class SM_Simulation:
         else:
             self.logInterval = 10 if logInterval is None else logInterval
             self.logger = logger
+        self.metrics = SM_SimMetrics(self, name)
+
+        try:
+            self.currentState = SM_ActiveState(startState, self.simData)
+        except SMRuntimeException:
+            self.metrics.runtimeErrors += 1
+            raise
 
     def run(self):
-        with self.logger as log:
-            while self.isRunning is True:
-                while self.remainingIterations is None or self.remainingIterations > 0:
-                    self.safe = False
-                    self.remainingIterations -= 1
-                    self.currentState.iterate(self.simData)
-                    self.elapsedIterations += 1
-
-                    if self.logInterval is not None and self.elapsedIterations % self.logInterval == 0:
-                        logDict = {"iteration": self.elapsedIterations, "logTime": datetime.now(), "data": self.simData}
-                        print(f"logging to {log.dbName}.{log.defaultTable}...")
-                        log.logData(logDict)
-                self.safe = True
+        metrics = self.metrics
+        clock = time.perf_counter
+        try:
+            with self.logger as log:
+                while self.isRunning is True:
+                    metrics.batchStarted(clock(), self.elapsedIterations)
+                    while self.remainingIterations is None or self.remainingIterations > 0:
+                        self.safe = False
+                        self.remainingIterations -= 1
+                        self.currentState.iterate(self.simData)
+                        self.elapsedIterations += 1
+
+                        if self.logInterval is not None and self.elapsedIterations % self.logInterval == 0:
+                            t0 = clock()
+                            metrics.logStarted(t0, self.elapsedIterations)
+                            logDict = {"iteration": self.elapsedIterations, "logTime": datetime.now(), "data": self.simData}
+                            print(f"logging to {log.dbName}.{log.defaultTable}...")
+                            logSuccess = False
+                            try:
+                                logSuccess = log.logData(logDict)
+                            finally:
+                                metrics.logStopped(t0, clock(), bool(logSuccess), self.elapsedIterations)
+                    metrics.batchStopped(clock(), self.elapsedIterations)
+                    self.safe = True
+        except SMRuntimeException:
+            metrics.runtimeErrors += 1
+            raise
+        finally:
+            metrics.batchStopped(clock(), self.elapsedIterations)
 
     def start(self, iterations=None):
 
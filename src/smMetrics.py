@@ -0,0 +1,245 @@
+from typing import Optional, Any
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import threading
+import time
+import warnings
+import weakref
+
+from .smExceptions import SMControlWarning
+
+_simCounter = itertools.count()
+_registryLock = threading.RLock()
+_registry: dict[str, "SM_SimMetrics"] = {}
+
+_counterKeys = ("iterations", "stepTime", "logTime", "logCount", "logFailures", "runtimeErrors")
+_retiredTotals: dict[str, float] = {key: 0 for key in _counterKeys}
+
+class SM_SimMetrics:
+    """
+    Counters describing the execution of a single simulation.
+
+    The counters are only written by the thread running the simulation, and only outside of the
+        per-iteration path: iterations are read from the owning simulation's elapsedIterations, and step
+        time is accumulated once per batch of iterations and at each log call. Other threads can read the
+        counters at any time through snapshot().
+
+    Names are unique among live simulations. If the requested name is already in use, a numeric suffix is added.
+    """
+
+    def __init__(self, owner: Any, name: Optional[str] = None):
+        self._owner = weakref.ref(owner)
+        self._iterations = 0
+        # (stepTime, markTime, markIterations), replaced as a whole so readers always see a consistent state
+        self._step: tuple[float, Optional[float], int] = (0.0, None, 0)
+        self._stepSeen = 0.0
+        self.logTime = 0.0
+        self.logCount = 0
+        self.logFailures = 0
+        self.runtimeErrors = 0
+
+        with _registryLock:
+            candidate = name if name is not None else f"sim{next(_simCounter)}"
+            while candidate in _registry:
+                candidate = f"{name if name is not None else 'sim'}-{next(_simCounter)}"
+            self.name = candidate
+            _registry[self.name] = self
+
+        weakref.finalize(owner, _retire, self)
+
+    @property
+    def stepTime(self) -> float:
+        """
+        Time spent iterating the state machine, including the batch currently in progress.
+
+        Never decreases between reads.
+        """
+        stepTime, mark, markIterations = self._step
+        if mark is not None:
+            owner = self._owner()
+            if owner is not None and owner.elapsedIterations > markIterations:
+                stepTime += time.perf_counter() - mark
+
+        seen = self._stepSeen
+        if stepTime < seen:
+            return seen
+        self._stepSeen = stepTime
+        return stepTime
+
+    def batchStarted(self, now: float, iterations: int):
+        self._step = (self._step[0], now, iterations)
+
+    def batchStopped(self, now: float, iterations: int):
+        """Close off the current batch, counting its time only if any iterations were run"""
+        stepTime, mark, markIterations = self._step
+        if mark is not None:
+            if iterations > markIterations:
+                stepTime += now - mark
+            self._step = (stepTime, None, iterations)
+        self._iterations = iterations
+
+    def logStarted(self, now: float, iterations: int):
+        """Close off the step time accumulated since the last mark, before a log call"""
+        self.batchStopped(now, iterations)
+
+    def logStopped(self, start: float, now: float, success: bool, iterations: int):
+        self.logTime += now - start
+        self.logCount += 1
+        if not success:
+            self.logFailures += 1
+        self.batchStarted(now, iterations)
+
+    def counters(self) -> dict[str, float]:
+        owner = self._owner()
+        return {
+            "iterations": owner.elapsedIterations if owner is not None else self._iterations,
+            "stepTime": self.stepTime,
+            "logTime": self.logTime,
+            "logCount": self.logCount,
+            "logFailures": self.logFailures,
+            "runtimeErrors": self.runtimeErrors,
+        }
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns the current value of every counter as a dictionary.
+
+        running is True while the simulation has iterations left to run. iterationsPerSecond is the
+            throughput while stepping, so time spent idle or logging does not lower it.
+        """
+        owner = self._owner()
+        snap = self.counters()
+        snap["running"] = owner is not None and owner.isRunning and \
+            (owner.remainingIterations is None or owner.remainingIterations > 0)
+        snap["iterationsPerSecond"] = snap["iterations"] / snap["stepTime"] if snap["stepTime"] > 0 else 0.0
+        return snap
+
+def _retire(metrics: SM_SimMetrics):
+    # Runs as a weakref finalizer, possibly from a garbage collection triggered while this thread
+    # already holds _registryLock, so the counters are captured first and the lock is reentrant
+    counters = metrics.counters()
+    with _registryLock:
+        if _registry.get(metrics.name) is metrics:
+            del _registry[metrics.name]
+        for key, value in counters.items():
+            _retiredTotals[key] += value
+
+def collectMetrics() -> dict[str, Any]:
+    """
+    Returns a snapshot of every live simulation's metrics, along with totals across all of them.
+
+    The result has the form {"simulations": {name: snapshot, ...}, "aggregate": totals}. The aggregate
+        counters include simulations that have since been garbage collected, so they never decrease.
+        The aggregate iterationsPerSecond only counts simulations that are currently running.
+    """
+    with _registryLock:
+        live = list(_registry.values())
+        aggregate: dict[str, Any] = dict(_retiredTotals)
+
+    sims = {}
+    aggregate["running"] = 0
+    aggregate["iterationsPerSecond"] = 0.0
+    for m in live:
+        snap = m.snapshot()
+        sims[m.name] = snap
+        for key in _counterKeys:
+            aggregate[key] += snap[key]
+        if snap["running"]:
+            aggregate["running"] += 1
+            aggregate["iterationsPerSecond"] += snap["iterationsPerSecond"]
+
+    return {"simulations": sims, "aggregate": aggregate}
+
+_promMetrics = (
+    ("iterations", "statepy_iterations_total", "counter", "State machine iterations executed"),
+    ("running", "statepy_running", "gauge", "Whether the simulation has iterations left to run"),
+    ("stepTime", "statepy_step_seconds_total", "counter", "Time spent iterating the state machine"),
+    ("logTime", "statepy_log_seconds_total", "counter", "Time spent logging simulation data"),
+    ("logCount", "statepy_logs_total", "counter", "Log calls made"),
+    ("logFailures", "statepy_log_failures_total", "counter", "Log calls that failed or were not acknowledged"),
+    ("runtimeErrors", "statepy_runtime_errors_total", "counter", "SMRuntimeExceptions raised while running"),
+)
+
+def _escapeLabel(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def metricsText() -> str:
+    """
+    Returns the current metrics in the Prometheus text exposition format.
+
+    Per-simulation series are labelled with the simulation's name. Totals across all simulations, including
+        ones that no longer exist, are exported under separate statepy_all_* metric names.
+    """
+    metrics = collectMetrics()
+    lines = []
+    for key, promName, promType, promHelp in _promMetrics:
+        lines.append(f"# HELP {promName} {promHelp}")
+        lines.append(f"# TYPE {promName} {promType}")
+        for name, snap in metrics["simulations"].items():
+            lines.append(f'{promName}{{simulation="{_escapeLabel(name)}"}} {float(snap[key])}')
+
+    for key, promName, promType, promHelp in _promMetrics:
+        allName = promName.replace("statepy_", "statepy_all_", 1)
+        lines.append(f"# HELP {allName} {promHelp} (all simulations)")
+        lines.append(f"# TYPE {allName} {promType}")
+        lines.append(f"{allName} {float(metrics['aggregate'][key])}")
+
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = metricsText().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class SM_MetricsExporter:
+    """
+    Serves the metrics of all live simulations over HTTP in the Prometheus text format.
+
+    The server runs in a daemon thread and binds to localhost by default. Like the loggers, it can be
+        used as a context manager:
+            with SM_MetricsExporter(port=9464):
+                sim.start(1000)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9464):
+        self.host = host
+        self.port = port
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.server is not None:
+            warnings.warn("Attempted to start a metrics exporter that was already running", SMControlWarning)
+            return
+
+        self.server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+        self.server = None
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,207 @@
+import gc
+import threading
+import urllib.request
+import warnings
+
+import pytest
+
+import src as sm
+from src.smLogging import SM_LoggerBC
+from src.smMetrics import SM_SimMetrics, collectMetrics, metricsText
+
+class ListLogger(SM_LoggerBC):
+    def __init__(self, result = True):
+        super().__init__("localhost", 0, "testdb")
+        self.result = result
+        self.logged = []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def logData(self, data: dict) -> bool:
+        if isinstance(self.result, Exception):
+            raise self.result
+        self.logged.append(data["iteration"])
+        return self.result
+
+def counterState():
+    s = sm.SM_State("Count")
+    s.enterAction = "x = 0"
+    s.duringAction = "x += 1"
+    return s
+
+def runThreaded(sim, iterations):
+    simThread = threading.Thread(target=sim.start, args=(iterations,))
+    simThread.start()
+    while not sim.isRunning:
+        pass
+    sim.wait()
+    sim.stop()
+    simThread.join()
+
+def test_countersAfterRun():
+    sim = sm.SM_Simulation(counterState(), {})
+    runThreaded(sim, 1000)
+
+    snap = sim.metrics.snapshot()
+    assert snap["iterations"] == 1000
+    assert snap["stepTime"] > 0
+    assert snap["iterationsPerSecond"] > 0
+    assert snap["running"] is False
+    assert snap["logCount"] == 0
+    assert snap["runtimeErrors"] == 0
+
+def test_logFailuresCountsUnacknowledgedLogs(capsys):
+    logger = ListLogger(result = False)
+    sim = sm.SM_Simulation(counterState(), {}, logInterval = 10, logger = logger)
+    runThreaded(sim, 100)
+
+    snap = sim.metrics.snapshot()
+    assert snap["logCount"] == 10
+    assert snap["logFailures"] == 10
+    assert snap["logTime"] > 0
+
+def test_logFailuresCountsRaisingLogger(capsys):
+    logger = ListLogger(result = ConnectionError("db down"))
+    sim = sm.SM_Simulation(counterState(), {}, logInterval = 10, logger = logger)
+    sim.isRunning = True
+    sim.remainingIterations = 100
+
+    with pytest.raises(ConnectionError):
+        sim.run()
+
+    snap = sim.metrics.snapshot()
+    assert snap["logCount"] == 1
+    assert snap["logFailures"] == 1
+    assert snap["iterations"] == 10
+
+def test_runtimeErrors():
+    s = sm.SM_State("Broken")
+    s.duringAction = "1 / 0"
+    sim = sm.SM_Simulation(s, {})
+    sim.isRunning = True
+    sim.remainingIterations = 5
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with pytest.raises(sm.SMRuntimeException):
+            sim.run()
+
+    assert sim.metrics.snapshot()["runtimeErrors"] == 1
+
+def test_duplicateNamesAreMadeUnique():
+    busy = sm.SM_Simulation(counterState(), {}, name = "dup")
+    idle = sm.SM_Simulation(counterState(), {}, name = "dup")
+    assert busy.metrics.name != idle.metrics.name
+
+    runThreaded(busy, 500)
+    sims = collectMetrics()["simulations"]
+    assert sims[busy.metrics.name]["iterations"] == 500
+    assert sims[idle.metrics.name]["iterations"] == 0
+
+def test_suffixedNamesDoNotCollide():
+    first = sm.SM_Simulation(counterState(), {}, name = "x")
+    second = sm.SM_Simulation(counterState(), {}, name = "x")
+    nextSuffix = int(second.metrics.name.rsplit("-", 1)[1]) + 1
+    squatter = sm.SM_Simulation(counterState(), {}, name = f"x-{nextSuffix}")
+    fourth = sm.SM_Simulation(counterState(), {}, name = "x")
+
+    sims = (first, second, squatter, fourth)
+    assert squatter.metrics.name == f"x-{nextSuffix}"
+    assert len({sim.metrics.name for sim in sims}) == 4
+    assert set(collectMetrics()["simulations"]) >= {sim.metrics.name for sim in sims}
+
+def test_generatedNamesDoNotCollide():
+    probe = sm.SM_Simulation(counterState(), {})
+    nextSuffix = int(probe.metrics.name[len("sim"):]) + 1
+    squatter = sm.SM_Simulation(counterState(), {}, name = f"sim{nextSuffix}")
+    generated = sm.SM_Simulation(counterState(), {})
+
+    assert generated.metrics.name != squatter.metrics.name
+    assert set(collectMetrics()["simulations"]) >= {squatter.metrics.name, generated.metrics.name}
+
+def test_stepTimeNeverDecreases(capsys):
+    sim = sm.SM_Simulation(counterState(), {}, logInterval = 1, logger = ListLogger())
+    readings = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            readings.append(sim.metrics.snapshot()["stepTime"])
+
+    readerThread = threading.Thread(target=reader)
+    readerThread.start()
+    try:
+        runThreaded(sim, 20000)
+    finally:
+        done.set()
+        readerThread.join()
+
+    assert len(readings) > 1
+    assert all(b >= a for a, b in zip(readings, readings[1:]))
+
+def test_raisingEntryActionIsCounted():
+    s = sm.SM_State("Broken")
+    s.enterAction = "1 / 0"
+    before = collectMetrics()["aggregate"]["runtimeErrors"]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with pytest.raises(sm.SMRuntimeException):
+            sm.SM_Simulation(s, {}, name = "brokenEntry")
+        metrics = collectMetrics()
+        metricsText()
+
+    assert metrics["aggregate"]["runtimeErrors"] == before + 1
+
+def test_aggregateSurvivesGarbageCollection():
+    sim = sm.SM_Simulation(counterState(), {})
+    runThreaded(sim, 300)
+    before = collectMetrics()["aggregate"]["iterations"]
+
+    name = sim.metrics.name
+    del sim
+    gc.collect()
+
+    metrics = collectMetrics()
+    assert name not in metrics["simulations"]
+    assert metrics["aggregate"]["iterations"] == before
+
+def test_metricsTextFormatAndEscaping():
+    sim = sm.SM_Simulation(counterState(), {}, name = 'we"ird\\name\n')
+    runThreaded(sim, 50)
+
+    text = metricsText()
+    assert text.endswith("\n")
+    assert '# TYPE statepy_iterations_total counter' in text
+    assert 'statepy_iterations_total{simulation="we\\"ird\\\\name\\n"} 50.0' in text
+    assert '__all__' not in text
+    for line in text.splitlines():
+        if line.startswith("statepy_all_"):
+            assert "{" not in line
+
+def test_exporterServesMetrics():
+    sim = sm.SM_Simulation(counterState(), {}, name = "exported")
+    runThreaded(sim, 20)
+
+    with sm.SM_MetricsExporter(port = 0) as exporter:
+        with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+            assert response.status == 200
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode()
+
+    assert 'statepy_iterations_total{simulation="exported"} 20.0' in body
+
+def test_exporterDoubleStartWarns():
+    exporter = sm.SM_MetricsExporter(port = 0)
+    exporter.start()
+    try:
+        server = exporter.server
+        with pytest.warns(sm.SMControlWarning):
+            exporter.start()
+        assert exporter.server is server
+    finally:
+        exporter.stop()